@@ -1,67 +1,346 @@
 # File: audit_logger.py
-import json
+import atexit
+import gzip
 import logging
-from datetime import datetime
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
+import orjson
+
 # =====================================================
 # Configuration
 # =====================================================
-AUDIT_FILE = Path("audit_log.json")
+AUDIT_FILE = Path("audit_log.jsonl")
+AUDIT_QUEUE_SIZE = 10000
+AUDIT_BATCH_SIZE = 64
+AUDIT_FLUSH_INTERVAL = 1.0
+AUDIT_MAX_BYTES = 50 * 1024 * 1024
+AUDIT_BACKUP_COUNT = 10
+LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
 
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+    format=LOG_FORMAT,
     handlers=[logging.StreamHandler()]
 )
 logger = logging.getLogger("audit_logger")
 
 # =====================================================
-# JSON Audit Utilities
+# JSONL Audit Handler
 # =====================================================
 
-def _load_audit_file():
-    """Load existing audit entries."""
-    if AUDIT_FILE.exists():
+def _gzip_segment(raw_path: str, gz_path: str):
+    """Compress a rolled-over audit segment and remove the raw copy."""
+    with open(raw_path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(raw_path)
+
+
+class AuditFileHandler(RotatingFileHandler):
+    """
+    Buffers audit records as compact JSON lines and writes them in batches.
+    Rolls over at `max_bytes`; closed segments are gzipped in the background
+    as audit_log.jsonl.N.gz.
+    Only records carrying an `audit_entry` attribute are written; records
+    carrying an `audit_marker` event are flush requests.
+    """
+
+    def __init__(self, path=AUDIT_FILE, max_bytes=AUDIT_MAX_BYTES, backup_count=AUDIT_BACKUP_COUNT):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        # RotatingFileHandler forces text mode; lines are already encoded bytes
+        self.mode = "ab"
+        self.encoding = None
+        self.delay = False
+        self.stream = self._open()
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._rotate
+        self._compressor = None
+        self.pending = deque()
+        self.batch_ready = threading.Event()
+        self.waiters = []  # flush_audit() events released by the next flush
+        self.addFilter(lambda record: hasattr(record, "audit_entry") or hasattr(record, "audit_marker"))
+        self._ts_second = None
+        self._ts_prefix = ""
+
+    def format_timestamp(self, created: float) -> str:
+        """Local ISO-8601 timestamp; the per-second prefix is formatted once."""
+        second = int(created)
+        if second != self._ts_second:
+            self._ts_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+            self._ts_second = second
+        return f"{self._ts_prefix}.{int((created - second) * 1_000_000):06d}"
+
+    def emit(self, record):
+        marker = getattr(record, "audit_marker", None)
+        if marker is not None:
+            # everything queued before the marker is in `pending`; the flusher
+            # writes it (together with any other waiters' lines) and releases us
+            self.waiters.append(marker)
+            self.batch_ready.set()
+            return
         try:
-            with open(AUDIT_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logger.warning("⚠️ Corrupted audit log, starting new.")
-    return []
+            entry = record.audit_entry
+            if "timestamp" not in entry:
+                # stamped here, on the writer thread, from the record's creation time
+                entry = {"timestamp": self.format_timestamp(record.created), **entry}
+            self.pending.append(
+                orjson.dumps(
+                    entry,
+                    option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS,
+                    default=str,
+                )
+            )
+            if len(self.pending) >= AUDIT_BATCH_SIZE:
+                self.batch_ready.set()
+        except Exception:
+            self.handleError(record)
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=1 << 16)
+
+    def _rotate(self, source, dest):
+        # Rename now, gzip on a background thread so the writer isn't held up.
+        raw = dest[:-len(".gz")]
+        os.rename(source, raw)
+        self._compressor = threading.Thread(
+            target=_gzip_segment, args=(raw, dest), name="audit-gzip", daemon=True
+        )
+        self._compressor.start()
+
+    def _wait_for_compressor(self):
+        if self._compressor is not None:
+            self._compressor.join()
+            self._compressor = None
+
+    def doRollover(self):
+        # Backups are shifted by name, so the previous segment must be finished.
+        self._wait_for_compressor()
+        super().doRollover()
+
+    def flush(self):
+        """Write every buffered line with a single write call."""
+        self.acquire()
+        waiters, self.waiters = self.waiters, []
+        try:
+            lines = []
+            while self.pending:
+                lines.append(self.pending.popleft())
+            if not lines or self.stream is None or self.stream.closed:
+                return
+            chunk = b"".join(lines)
+            self.stream.seek(0, os.SEEK_END)
+            size = self.stream.tell()
+            if self.maxBytes > 0 and size > 0 and size + len(chunk) > self.maxBytes:
+                self.doRollover()
+            self.stream.write(chunk)
+            self.stream.flush()
+        finally:
+            self.release()
+            for waiter in waiters:
+                waiter.set()
+
+    def close(self):
+        self.flush()
+        self._wait_for_compressor()
+        super().close()
+
+
+class _AuditQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Block instead of raising when the queue is full at shutdown.
+        self.queue.put(self._sentinel)
+
+
+# =====================================================
+# Background Writer
+# =====================================================
+# Callers only enqueue; file and console I/O run on listener threads so
+# log_step never blocks the event loop on disk writes. Console records get
+# their own queue so they can't fill up (or be dropped with) audit entries.
+_audit_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+_console_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+_dropped_entries = 0
+_dropped_console = 0
+_writers_running = False
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks or raises on the caller's thread; a full queue drops the record."""
+
+    def enqueue(self, record):
+        global _dropped_console
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _dropped_console += 1
+
 
+_file_handler = AuditFileHandler()
+_console_handler = logging.StreamHandler()
+_console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+_console_queue_handler = _DroppingQueueHandler(_console_queue)
 
-def _save_audit_file(data):
-    """Write full audit log back to disk."""
-    with open(AUDIT_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+logger.addHandler(_console_queue_handler)
+logger.propagate = False
 
 
+def _warn_direct(message: str):
+    # straight to the console handler (we're on the flusher thread), so the
+    # warning can't be lost to the full queue it is reporting on
+    _console_handler.handle(
+        logger.makeRecord(logger.name, logging.WARNING, __file__, 0, message, None, None)
+    )
+
+
+def _flusher():
+    """Flush buffered entries every interval, or sooner once a batch fills up."""
+    reported_drops = reported_console = 0
+    while True:
+        _file_handler.batch_ready.wait(AUDIT_FLUSH_INTERVAL)
+        _file_handler.batch_ready.clear()
+        _file_handler.flush()
+        if _dropped_entries > reported_drops:
+            _warn_direct(f"⚠️ Audit queue full, dropped {_dropped_entries - reported_drops} entries.")
+            reported_drops = _dropped_entries
+        if _dropped_console > reported_console:
+            _warn_direct(f"⚠️ Console log queue full, dropped {_dropped_console - reported_console} records.")
+            reported_console = _dropped_console
+
+
+def _start_writers():
+    global _listener, _console_listener, _writers_running
+    _listener = _AuditQueueListener(_audit_queue, _file_handler, respect_handler_level=True)
+    _console_listener = _AuditQueueListener(_console_queue, _console_handler, respect_handler_level=True)
+    _listener.start()
+    _console_listener.start()
+    threading.Thread(target=_flusher, name="audit-flusher", daemon=True).start()
+    _writers_running = True
+
+
+_start_writers()
+
+
+def _restart_after_fork():
+    """The listener and flusher threads don't survive fork(); give the child its own."""
+    global _audit_queue, _console_queue
+    _audit_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+    _console_queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+    _console_queue_handler.queue = _console_queue
+    _file_handler.pending.clear()  # the parent writes its own buffered lines
+    _file_handler.waiters = []
+    _file_handler.batch_ready = threading.Event()
+    _file_handler._compressor = None
+    _start_writers()
+
+
+if hasattr(os, "register_at_fork"):
+    # flush first so the child doesn't inherit (and re-write) buffered lines
+    os.register_at_fork(before=_file_handler.flush, after_in_child=_restart_after_fork)
+
+
+def flush_audit():
+    """
+    Block until every entry this thread logged so far has been written to disk.
+    Waits only for a marker queued behind those entries, not for the queue to
+    go idle; concurrent callers share a single write.
+    """
+    if not _writers_running:
+        _file_handler.flush()
+        return
+    done = threading.Event()
+    _audit_queue.put(logging.makeLogRecord({
+        "name": logger.name,
+        "levelno": logging.INFO,
+        "levelname": "INFO",
+        "audit_marker": done,
+    }))
+    done.wait()
+
+
+def _shutdown():
+    """Drain pending records and flush the audit file."""
+    global _writers_running
+    if not _writers_running:
+        return
+    _listener.stop()
+    _console_listener.stop()
+    _writers_running = False
+    flush_audit()
+
+
+atexit.register(_shutdown)
+
+# =====================================================
+# JSONL Audit Utilities
+# =====================================================
+
 def append_audit_entry(entry: dict):
     """
     Append structured audit entry to the global audit log.
     Each entry should contain:
-      - timestamp
+      - timestamp (filled in from the enqueue time if missing)
       - step (optional)
       - status
       - data / output
       - error (if applicable)
+    Entries are dropped (and counted) if the writer falls behind.
     """
+    global _dropped_entries
+    record = logging.makeLogRecord({
+        "name": logger.name,
+        "levelno": logging.INFO,
+        "levelname": "INFO",
+        "audit_entry": entry,
+    })
     try:
-        data = _load_audit_file()
-        data.append(entry)
-        _save_audit_file(data)
-    except Exception as e:
-        logger.error(f"❌ Failed to write audit entry: {e}")
+        _audit_queue.put_nowait(record)
+    except queue.Full:
+        _dropped_entries += 1
+
+
+def _audit_segments():
+    """Audit log files from oldest to newest (rotated .gz segments first)."""
+    segments = []
+    for i in range(AUDIT_BACKUP_COUNT, 0, -1):
+        raw = Path(f"{AUDIT_FILE}.{i}")
+        gz = Path(f"{raw}.gz")
+        # a raw segment only exists while it is still being compressed
+        if raw.exists():
+            segments.append((raw, open))
+        elif gz.exists():
+            segments.append((gz, gzip.open))
+    if AUDIT_FILE.exists():
+        segments.append((AUDIT_FILE, open))
+    return segments
+
+
+def read_audit_entries():
+    """Yield parsed audit entries (across rotated segments) in the order they were written."""
+    flush_audit()
+    for path, opener in _audit_segments():
+        with opener(path, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    logger.warning(f"⚠️ Skipping corrupted audit log line in {path}.")
 
 
 def log_step(step_name: str, status: str, data=None, error=None):
     """
     Unified way to log both console + JSON audit.
+    The timestamp is added by the audit writer thread.
     """
-    timestamp = datetime.now().isoformat()
     entry = {
-        "timestamp": timestamp,
         "step": step_name,
         "status": status,
         "data": data,
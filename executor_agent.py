@@ -6,10 +6,10 @@ resolving dependencies and invoking OpenSearch tools safely.
 """
 
 import asyncio
-import json
 import logging
-from datetime import datetime
 from copy import deepcopy
+from datetime import datetime
+from graphlib import TopologicalSorter
 
 # Import tooling functions
 from tools.main_opensearch import (
@@ -17,8 +17,11 @@ from tools.main_opensearch import (
     search_raw_logs,
     search_alerts,
     get_agent_data,
-    search_vulnerabilities
+    search_vulnerabilities,
+    msearch_tools,
+    SEARCH_TOOLS
 )
+from tools.cache import TieredCache, make_key
 
 # =====================================================
 # Logging Configuration
@@ -39,49 +42,202 @@ TOOL_MAPPING = {
     "get_agent_data": get_agent_data,
     "search_vulnerabilities": search_vulnerabilities
 }
+# TOOL_MAPPING is static, so resolve sync/async once instead of per task
+_IS_ASYNC = {name: asyncio.iscoroutinefunction(f) for name, f in TOOL_MAPPING.items()}
+
+# =====================================================
+# Tool Result Cache
+# =====================================================
+# Process-wide, shared across plans: hot LRU in RAM, spilled to local disk.
+# Keyed by sha1(tool_name + canonical kwargs).
+RESULTS_CACHE_DIR = ".cache/exec"
+_RESULTS = TieredCache(ram_lru=256, ttl=600, disk_dir=RESULTS_CACHE_DIR)
+# Pure, no-I/O tools: run inline and skip the cache
+LOCAL_TOOLS = {"build_query"}
 
 # =====================================================
 # 🔹 Utility Helpers
 # =====================================================
-def safe_json(obj):
-    """Ensure result is JSON-serializable."""
-    try:
-        json.dumps(obj)
-        return obj
-    except TypeError:
-        return str(obj)
+# Tool-specific clauses appended to bool.must (shared, treat as read-only)
+_CLAUSES = {
+    "search_alerts": (
+        {"match_phrase": {"rule.description": "ssh"}},
+        {"range": {"rule.level": {"gte": 5}}},
+    ),
+    "search_raw_logs": (
+        {"match_phrase": {"event.action": "failure"}},
+        {"match_phrase": {"process.name": "sshd"}},
+    ),
+    "search_vulnerabilities": (
+        {"wildcard": {"vulnerability.id": "CVE-*"}},
+    ),
+}
+
 
 def refine_query_for_tool(base_query: dict, tool_name: str):
     """Adjust or extend the query structure for each tool."""
     if not isinstance(base_query, dict):
         return base_query
 
-    refined_query = deepcopy(base_query)
-    refined_query.setdefault("bool", {}).setdefault("must", [])
-
-    if tool_name == "search_alerts":
-        refined_query["bool"]["must"] += [
-            {"match_phrase": {"rule.description": "ssh"}},
-            {"range": {"rule.level": {"gte": 5}}}
-        ]
-    elif tool_name == "search_raw_logs":
-        refined_query["bool"]["must"] += [
-            {"match_phrase": {"event.action": "failure"}},
-            {"match_phrase": {"process.name": "sshd"}}
-        ]
-    elif tool_name == "search_vulnerabilities":
-        refined_query["bool"]["must"].append({"wildcard": {"vulnerability.id": "CVE-*"}})
+    # shallow clone, copying only the bool.must path we extend
+    refined_query = dict(base_query)
+    bool_query = dict(refined_query.get("bool", {}))
+    must = list(bool_query.get("must", []))
 
+    must.extend(_CLAUSES.get(tool_name, ()))
+    bool_query["must"] = must
+    refined_query["bool"] = bool_query
     return refined_query
 
 
+def result_key(tool_name: str, kwargs: dict) -> str:
+    """Cache key for a tool call's result."""
+    return make_key(tool_name, kwargs)
+
+
+def pin(key: str):
+    """Keep a cached tool result hot in RAM (never evicted or expired)."""
+    _RESULTS.pin(key)
+
+
+def pin_result(tool_name: str, **kwargs):
+    """pin() by tool call, e.g. for a playbook's "failed SSH" search."""
+    pin(result_key(tool_name, kwargs))
+
+
+# _RESULTS may hit its disk tier (SQLite + pickle), so these helpers run in
+# worker threads. Like execute_tool's cache, every reader and the store get
+# their own deep copy, so one plan can't mutate another plan's results.
+def _cached_copies(keys):
+    copies = []
+    for key in keys:
+        cached = _RESULTS.get(key)
+        copies.append(None if cached is None else deepcopy(cached))
+    return copies
+
+
+def _store_results(items):
+    for key, result in items:
+        # only cache successful, non-error results
+        if not (isinstance(result, dict) and "error" in result):
+            _RESULTS.set(key, deepcopy(result))
+
+
+def _run_and_store(func, kwargs, key):
+    result = func(**kwargs)
+    _store_results([(key, result)])
+    return result
+
+
+async def _call_tool(tool_name: str, func, kwargs: dict):
+    """
+    Invoke a tool, serving and populating the result cache.
+    Blocking OpenSearch tools (and their cache store) run in a worker thread
+    so sibling tasks overlap.
+    """
+    if tool_name in LOCAL_TOOLS:
+        return (await func(**kwargs)) if _IS_ASYNC[tool_name] else func(**kwargs)
+
+    key = result_key(tool_name, kwargs)
+    [cached] = await asyncio.to_thread(_cached_copies, [key])
+    if cached is not None:
+        logger.info(f"♻️ Cache hit for tool '{tool_name}'.")
+        return cached
+
+    if _IS_ASYNC[tool_name]:
+        result = await func(**kwargs)
+        await asyncio.to_thread(_store_results, [(key, result)])
+        return result
+    return await asyncio.to_thread(_run_and_store, func, kwargs, key)
+
+
 # =====================================================
 # 🔹 Core Task Execution
 # =====================================================
+def build_task_kwargs(task, results_cache):
+    """Resolve a task's tool arguments from its sub_task and dependency results."""
+    tool_name = task.get("tool_name")
+    sub_task = task.get("sub_task", "")
+    kwargs = {}
+    base_query = None
+
+    # =====================================================
+    # 🧩 Build Query
+    # =====================================================
+    if tool_name == "build_query":
+        kwargs = {"query_string": sub_task, "time_range": "2d"}
+
+    # =====================================================
+    # 🔍 Search Tools
+    # =====================================================
+    elif tool_name in SEARCH_TOOLS:
+        # safely read dependencies (handles None or empty lists)
+        deps = task.get("dependent_on_tasks") or []
+        prev_task_id = deps[0] if len(deps) > 0 else None
+
+        # try to extract a usable base_query from dependency result (if any)
+        if prev_task_id:
+            prev_result = results_cache.get(prev_task_id)
+            if isinstance(prev_result, dict):
+                # prev_result could be {'query': {...}} or directly the query dict
+                if "query" in prev_result and isinstance(prev_result["query"], dict):
+                    base_query = prev_result["query"]
+                else:
+                    base_query = prev_result
+            else:
+                base_query = prev_result
+
+        # if no base_query available, ask the build_query tool and normalize its shape
+        if not base_query:
+            logger.warning(f"No base query found for {tool_name}, building fresh.")
+            built = build_query(sub_task, time_range="2d")
+            # build_query might return {'query': {...}} or the query dict itself
+            if isinstance(built, dict) and "query" in built and isinstance(built["query"], dict):
+                base_query = built["query"]
+            else:
+                base_query = built
+
+        # refine and normalize before sending to underlying tool
+        refined = refine_query_for_tool(base_query, tool_name)
+        # unwrap if the refine returned a top-level {"query": {...}} wrapper
+        if isinstance(refined, dict) and "query" in refined and len(refined) == 1:
+            refined = refined["query"]
+
+        kwargs["query"] = refined
+        kwargs["time_range"] = "2d"
+
+    # =====================================================
+    # 🧠 Agent Data Lookup
+    # =====================================================
+    elif tool_name == "get_agent_data":
+        deps = task.get("dependent_on_tasks") or []
+        first = results_cache.get(deps[0]) if deps else None
+        agent_name = None
+        if isinstance(first, list) and len(first) > 0:
+            try:
+                agent_name = first[0].get("agent", {}).get("name")
+            except Exception:
+                logger.warning("Could not extract agent name from dependency.")
+        # Note: get_agent_data expects agent_id or agent_name
+        kwargs = {"agent_name": agent_name}
+
+    return kwargs
+
+
+def _finalize_task(task, tool_name, result, results_cache):
+    """
+    Store a task result for dependents and wrap it for the plan output.
+    Results stay as-is; they are serialized once, at the I/O boundary.
+    """
+    results_cache[task["task_id"]] = result
+
+    logger.info(f"✅ Task {task['task_id']} executed with tool '{tool_name}'.")
+    return {"task_id": task["task_id"], "result": result}
+
+
 async def execute_task(task, results_cache):
     """Executes a single task safely using mapped tools."""
     tool_name = task.get("tool_name")
-    sub_task = task.get("sub_task", "")
     func = TOOL_MAPPING.get(tool_name)
 
     if not func:
@@ -89,106 +245,101 @@ async def execute_task(task, results_cache):
         logger.error(error_msg)
         return {"task_id": task.get("task_id"), "error": error_msg}
 
-    kwargs = {}
-    base_query = None
-    result = None
-
     try:
-        # =====================================================
-        # 🧩 Build Query
-        # =====================================================
-        if tool_name == "build_query":
-            result = func(sub_task, time_range="2d")
-
-        # =====================================================
-        # 🔍 Search Tools
-        # =====================================================
-        elif tool_name in ["search_raw_logs", "search_alerts", "search_vulnerabilities"]:
-            # safely read dependencies (handles None or empty lists)
-            deps = task.get("dependent_on_tasks") or []
-            prev_task_id = deps[0] if len(deps) > 0 else None
-
-            # try to extract a usable base_query from dependency result (if any)
-            if prev_task_id:
-                prev_result = results_cache.get(prev_task_id)
-                if isinstance(prev_result, dict):
-                    # prev_result could be {'query': {...}} or directly the query dict
-                    if "query" in prev_result and isinstance(prev_result["query"], dict):
-                        base_query = prev_result["query"]
-                    else:
-                        base_query = prev_result
-                else:
-                    base_query = prev_result
+        kwargs = build_task_kwargs(task, results_cache)
+        result = await _call_tool(tool_name, func, kwargs)
+        return _finalize_task(task, tool_name, result, results_cache)
 
-            # if no base_query available, ask the build_query tool and normalize its shape
-            if not base_query:
-                logger.warning(f"No base query found for {tool_name}, building fresh.")
-                built = build_query(sub_task, time_range="2d")
-                # build_query might return {'query': {...}} or the query dict itself
-                if isinstance(built, dict) and "query" in built and isinstance(built["query"], dict):
-                    base_query = built["query"]
-                else:
-                    base_query = built
+    except Exception as e:
+        logger.exception(f"Error executing {tool_name}: {e}")
+        return {"task_id": task.get("task_id"), "error": str(e)}
 
-            # refine and normalize before sending to underlying tool
-            refined = refine_query_for_tool(base_query, tool_name)
-            # unwrap if the refine returned a top-level {"query": {...}} wrapper
-            if isinstance(refined, dict) and "query" in refined and len(refined) == 1:
-                refined = refined["query"]
 
-            kwargs["query"] = refined
-            kwargs["time_range"] = "2d"
+async def execute_search_batch(tasks, results_cache):
+    """
+    Executes several search tasks with one OpenSearch _msearch round-trip.
+    Cached searches are served locally; falls back to per-task execution
+    if the batched request fails.
+    """
+    task_results = {}
+    lookups = []  # (task, kwargs, cache_key)
+    for task in tasks:
+        tool_name = task["tool_name"]
+        try:
+            kwargs = build_task_kwargs(task, results_cache)
+        except Exception as e:
+            logger.exception(f"Error executing {tool_name}: {e}")
+            task_results[task["task_id"]] = {"task_id": task["task_id"], "error": str(e)}
+            continue
+        lookups.append((task, kwargs, result_key(tool_name, kwargs)))
+
+    pending = []
+    cached_results = await asyncio.to_thread(_cached_copies, [key for _, _, key in lookups])
+    for (task, kwargs, key), cached in zip(lookups, cached_results):
+        if cached is not None:
+            logger.info(f"♻️ Cache hit for tool '{task['tool_name']}'.")
+            task_results[task["task_id"]] = _finalize_task(task, task["tool_name"], cached, results_cache)
+        else:
+            pending.append((task, kwargs, key))
 
-            result = (
-                await func(**kwargs)
-                if asyncio.iscoroutinefunction(func)
-                else func(**kwargs)
+    if pending:
+        try:
+            results = await asyncio.to_thread(
+                msearch_tools, [(task["tool_name"], kwargs) for task, kwargs, _ in pending]
             )
-
-        # =====================================================
-        # 🧠 Agent Data Lookup
-        # =====================================================
-        elif tool_name == "get_agent_data":
-            deps = task.get("dependent_on_tasks") or []
-            prev_results = [results_cache.get(tid) for tid in deps]
-            agent_name = None
-            if prev_results:
-                try:
-                    first = prev_results[0]
-                    if isinstance(first, list) and len(first) > 0:
-                        agent_name = first[0].get("agent", {}).get("name")
-                except Exception:
-                    logger.warning("Could not extract agent name from dependency.")
-            # Note: get_agent_data expects agent_id or agent_name
-            result = func(agent_name=agent_name)
-
-        # =====================================================
-        # 🧩 Default / Fallback
-        # =====================================================
+        except Exception as e:
+            logger.warning(f"msearch failed ({e}), running searches individually.")
+            fallback = await asyncio.gather(
+                *[execute_task(task, results_cache) for task, _, _ in pending]
+            )
+            task_results.update((r["task_id"], r) for r in fallback)
         else:
-            result = func()
+            await asyncio.to_thread(
+                _store_results, [(key, result) for (_, _, key), result in zip(pending, results)]
+            )
+            for (task, _, _), result in zip(pending, results):
+                task_results[task["task_id"]] = _finalize_task(
+                    task, task["tool_name"], result, results_cache
+                )
 
-        # =====================================================
-        # ✅ Finalize and Store
-        # =====================================================
-        result = safe_json(result)
-        results_cache[task["task_id"]] = result
+    return [task_results[task["task_id"]] for task in tasks]
 
-        logger.info(f"✅ Task {task['task_id']} executed with tool '{tool_name}'.")
-        return {"task_id": task["task_id"], "result": result}
 
-    except Exception as e:
-        logger.exception(f"Error executing {tool_name}: {e}")
-        return {"task_id": task.get("task_id"), "error": str(e)}
+async def _execute_wave(tasks, results_cache):
+    """Run one wave of ready tasks; sibling searches share a single _msearch."""
+    searches = [t for t in tasks if t.get("tool_name") in SEARCH_TOOLS]
+    if len(searches) < 2:
+        return await asyncio.gather(*[execute_task(t, results_cache) for t in tasks])
+
+    others = [t for t in tasks if t.get("tool_name") not in SEARCH_TOOLS]
+    search_results, other_results = await asyncio.gather(
+        execute_search_batch(searches, results_cache),
+        asyncio.gather(*[execute_task(t, results_cache) for t in others]),
+    )
+    by_id = {r["task_id"]: r for r in [*search_results, *other_results]}
+    return [by_id[t.get("task_id")] for t in tasks]
 
 
 # =====================================================
 # 🔹 Plan Orchestration
 # =====================================================
+def _unschedulable_tasks(deps_of: dict) -> list:
+    """Task ids that can never run: caught in a cycle or depending on one."""
+    resolved = set()
+    changed = True
+    while changed:
+        changed = False
+        for tid, deps in deps_of.items():
+            if tid not in resolved and deps <= resolved:
+                resolved.add(tid)
+                changed = True
+    return [tid for tid in deps_of if tid not in resolved]
+
+
 async def run_execution_plan(plan: dict):
     """
-    Executes a complete investigation plan sequentially,
-    resolving dependencies dynamically.
+    Executes a complete investigation plan as a dependency DAG,
+    running each wave of ready tasks concurrently.
     """
     if not plan or "plans" not in plan:
         return {"status": False, "error": "Invalid plan format"}
@@ -197,21 +348,38 @@ async def run_execution_plan(plan: dict):
     results_cache = {}
     task_results = []
 
+    tasks = {}
     for task in plan["plans"]:
-        task_id = task.get("task_id")
-        deps = task.get("dependent_on_tasks", []) or []
-
-        # 🔄 Resolve Dependencies
-        for dep_id in deps:
-            if dep_id not in results_cache:
-                dep_task = next((t for t in plan["plans"] if t["task_id"] == dep_id), None)
-                if dep_task:
-                    dep_result = await execute_task(dep_task, results_cache)
-                    task_results.append(dep_result)
-
-        # ⚙️ Execute Current Task
-        result = await execute_task(task, results_cache)
-        task_results.append(result)
+        tid = task.get("task_id")
+        if tid is None or tid in tasks:
+            reason = "missing task_id" if tid is None else "duplicate task_id"
+            error_msg = f"❌ Task '{tid}' skipped: {reason}."
+            logger.error(error_msg)
+            task_results.append({"task_id": tid, "error": error_msg})
+            continue
+        tasks[tid] = task
+
+    # unknown dependency ids and self-dependencies are ignored rather than blocking the task
+    deps_of = {
+        tid: {d for d in (task.get("dependent_on_tasks") or []) if d in tasks and d != tid}
+        for tid, task in tasks.items()
+    }
+    stuck = _unschedulable_tasks(deps_of)
+    sorter = TopologicalSorter({tid: deps for tid, deps in deps_of.items() if tid not in stuck})
+    sorter.prepare()
+
+    # each task runs exactly once, in waves of tasks whose deps are all done
+    while sorter.is_active():
+        ready = sorter.get_ready()
+        wave_results = await _execute_wave([tasks[tid] for tid in ready], results_cache)
+        task_results.extend(wave_results)
+        sorter.done(*ready)
+
+    # 🔄 Tasks in (or downstream of) a dependency cycle never become ready
+    for tid in stuck:
+        error_msg = f"❌ Task '{tid}' skipped: circular dependency."
+        logger.error(error_msg)
+        task_results.append({"task_id": tid, "error": error_msg})
 
     aggregated_results = {
         r["task_id"]: r.get("result")
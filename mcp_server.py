@@ -15,7 +15,6 @@ This bridges OpenWebUI's MCP protocol with the cybersecurity orchestrator pipeli
 """
 
 import asyncio
-import json
 import traceback
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
@@ -24,7 +23,7 @@ from pydantic import BaseModel
 import uvicorn
 
 # Internal imports
-from orchestrator import run_full_analysis
+from orchestrator import run_analysis, SafeJSONResponse
 from audit_logger import log_step
 
 
@@ -54,19 +53,8 @@ async def run_cyber_investigation(user_input: str) -> dict:
     print(f"\n🧠 [MCP] Received investigation request: {user_input}")
 
     try:
-        # Dummy FastAPI-style request to reuse orchestrator directly
-        class DummyRequest:
-            async def json(self):
-                return {"user_input": user_input}
-
-        dummy_request = DummyRequest()
-        response = await run_full_analysis(dummy_request)
-
-        # Decode orchestrator's JSONResponse
-        try:
-            data = json.loads(response.body.decode())
-        except Exception:
-            data = response if isinstance(response, dict) else {"raw_response": str(response)}
+        # Call the orchestrator pipeline directly (no HTTP request/response round-trip)
+        data, _ = await run_analysis(user_input)
 
         log_step("mcp_invocation", "success", {"summary": "Investigation completed"})
         print("✅ [MCP] Investigation completed successfully.\n")
@@ -125,7 +113,7 @@ async def run_investigation(req: InvestigationRequest, request: Request):
 
         # Run investigation through MCP tool
         result = await run_cyber_investigation(user_input)
-        return JSONResponse(result)
+        return SafeJSONResponse(result)
 
     except Exception as e:
         err_trace = traceback.format_exc()
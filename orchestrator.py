@@ -14,13 +14,14 @@ Compatible with:
 import json
 import asyncio
 from datetime import datetime
+import orjson
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
 # Import core agents
 from planner_agent import generate_plan, generate_report_from_results
 from executor_agent import run_execution_plan
-from audit_logger import log_step
+from audit_logger import log_step, flush_audit
 
 
 # =====================================================
@@ -29,6 +30,13 @@ from audit_logger import log_step
 app = FastAPI(title="Cybersecurity Orchestrator (MCP Compatible)")
 
 
+class SafeJSONResponse(JSONResponse):
+    """JSONResponse that stringifies values JSON can't represent (tool results are stored raw)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS, default=str)
+
+
 @app.get("/")
 async def index():
     return {
@@ -73,6 +81,24 @@ async def run_full_analysis(request: Request):
             status_code=400,
         )
 
+    result, status_code = await run_analysis(user_input)
+    return SafeJSONResponse(result, status_code=status_code)
+
+
+async def run_analysis(user_input: str):
+    """
+    Core planner → executor → report pipeline for a single goal.
+    Returns a (result_dict, http_status_code) tuple.
+    """
+    # direct callers (the MCP tool) skip run_full_analysis' payload check
+    if not user_input or not str(user_input).strip():
+        log_step("orchestration", "failed", {"error": "Missing user_input or input"})
+        return {
+            "status": False,
+            "error": "Missing 'user_input' or 'input' in request payload",
+            "received": {"user_input": user_input},
+        }, 400
+
     # =====================================================
     # Step 1: PLAN GENERATION
     # =====================================================
@@ -80,21 +106,14 @@ async def run_full_analysis(request: Request):
     print(f"\n🔹 [Orchestrator] Generating plan for: {user_input}")
 
     try:
-        plan_data = (
-            await generate_plan(user_input)
-            if asyncio.iscoroutinefunction(generate_plan)
-            else generate_plan(user_input)
-        )
+        plan_data = await generate_plan(user_input)
     except Exception as e:
         log_step("plan_generation", "failed", {"error": str(e)})
-        return JSONResponse({"status": False, "error": f"Planner error: {e}"}, status_code=500)
+        return {"status": False, "error": f"Planner error: {e}"}, 500
 
     if not plan_data.get("status"):
         log_step("plan_generation", "failed", data=plan_data)
-        return JSONResponse(
-            {"status": False, "error": "Planner failed", "details": plan_data},
-            status_code=500,
-        )
+        return {"status": False, "error": "Planner failed", "details": plan_data}, 500
 
     log_step("plan_generation", "success", data={"plan_tasks": len(plan_data.get("plan", {}).get("plans", []))})
     print("✅ Plan generated successfully.")
@@ -106,21 +125,14 @@ async def run_full_analysis(request: Request):
     print("🔹 [Orchestrator] Executing generated plan...")
 
     try:
-        exec_data = (
-            await run_execution_plan(plan_data["plan"])
-            if asyncio.iscoroutinefunction(run_execution_plan)
-            else run_execution_plan(plan_data["plan"])
-        )
+        exec_data = await run_execution_plan(plan_data["plan"])
     except Exception as e:
         log_step("plan_execution", "failed", {"error": str(e)})
-        return JSONResponse({"status": False, "error": f"Executor error: {e}"}, status_code=500)
+        return {"status": False, "error": f"Executor error: {e}"}, 500
 
     if not exec_data.get("status"):
         log_step("plan_execution", "failed", data=exec_data)
-        return JSONResponse(
-            {"status": False, "error": "Executor failed", "details": exec_data},
-            status_code=500,
-        )
+        return {"status": False, "error": "Executor failed", "details": exec_data}, 500
 
     log_step("plan_execution", "success", data=exec_data)
     print("✅ Plan executed successfully.")
@@ -144,7 +156,9 @@ async def run_full_analysis(request: Request):
     print("🔹 [Orchestrator] Generating SOC report...")
 
     try:
-        report_result = generate_report_from_results(
+        # blocking HTTP call, keep it off the event loop
+        report_result = await asyncio.to_thread(
+            generate_report_from_results,
             goal=plan_data.get("goal"),
             exec_results=combined_result,
         )
@@ -165,9 +179,10 @@ async def run_full_analysis(request: Request):
     # Step 5: FINALIZE
     # =====================================================
     log_step("orchestration_complete", "success", data={"goal": user_input})
+    await asyncio.to_thread(flush_audit)
     print("🏁 [Orchestrator] Workflow completed successfully.\n")
 
-    return JSONResponse(combined_result)
+    return combined_result, 200
 
 
 # =====================================================
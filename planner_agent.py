@@ -5,14 +5,20 @@ Creates structured multi-step investigation plans
 based on user input, with full tool awareness.
 """
 
+import asyncio
 import json
 import re
+import orjson
 import requests
+from collections import Counter
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
-from tools.main_opensearch import TOOLS
+from tools.main_opensearch import TOOLS, SOURCE_IP_FIELDS
+from tools.cache import TTLCache, make_key
 from audit_logger import log_step
 
 API_ENDPOINT = "http://10.10.111.11:8000/v1/chat/completions"
@@ -20,16 +26,42 @@ API_KEY = "Td4nbrkzNBx2d1kqBRNyOtYn5e"
 
 app = FastAPI(title="Cybersecurity Planning Agent (Tool-Aware)")
 
+# Shared keep-alive session so plan + report calls reuse one pooled connection
+_session = requests.Session()
+_session.headers.update({"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"})
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.2),
+)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+# Plans for recently seen goals, keyed by sha1(user_input)
+_PLAN_CACHE = TTLCache(maxsize=512, ttl=300)
+
 # =====================================================
 # Utility Helpers
 # =====================================================
 
+_CODEBLOCK_RE = re.compile(r'```json(.*?)```', re.DOTALL)
+_JSON_BODY_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+
 def extract_json_from_text(text: str):
     """Extract valid JSON safely from LLM output."""
-    codeblock = re.search(r'```json(.*?)```', text, re.DOTALL)
+    # well-behaved responses are already pure JSON
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+
+    codeblock = _CODEBLOCK_RE.search(text)
     if codeblock:
         text = codeblock.group(1)
-    match = re.search(r'\{.*\}', text, re.DOTALL)
+    match = _JSON_BODY_RE.search(text)
     if not match:
         raise ValueError("No JSON found in model output.")
     return json.loads(match.group(0))
@@ -44,25 +76,11 @@ def build_tool_context():
         lines.append(f"- {name}: {meta['description']} (inputs: {inputs}, outputs: {outputs})")
     return "\n".join(lines)
 
-# =====================================================
-# API Routes
-# =====================================================
-
-@app.get("/")
-async def index():
-    return {"message": "Cybersecurity Planning Agent is online and tool-aware."}
-
 
-@app.post("/create_plan")
-async def create_plan(request: Request):
-    """Generate structured investigation plan."""
-    body = await request.json()
-    user_input = body.get("user_input")
-    if not user_input:
-        return JSONResponse({"status": False, "error": "No input provided"}, status_code=400)
+# TOOLS is static, so the tool context and prompt templates are built once.
+_TOOL_CONTEXT = build_tool_context()
 
-    tool_context = build_tool_context()
-    prompt = f"""
+_PLAN_PROMPT_TEMPLATE = """
 You are **XYZ**, a senior cybersecurity analyst and task planner in a SOC team.
 Your job is to decompose an investigation goal into precise, executable tasks.
 
@@ -91,6 +109,47 @@ Expected JSON Schema:
 User Goal: "{user_input}"
 """
 
+_REPORT_PROMPT_TEMPLATE = """
+You are XYZ, a senior SOC analyst creating an incident report.
+
+Investigation Goal:
+"{goal}"
+
+Execution Results Summary (JSON):
+{results}
+
+Write a structured SOC report that includes:
+- Executive Summary
+- Key Findings
+- Detected Threats / Anomalies
+- Recommendations
+"""
+
+# =====================================================
+# API Routes
+# =====================================================
+
+@app.get("/")
+async def index():
+    return {"message": "Cybersecurity Planning Agent is online and tool-aware."}
+
+
+@app.post("/create_plan")
+async def create_plan(request: Request):
+    """Generate structured investigation plan."""
+    body = await request.json()
+    user_input = body.get("user_input")
+    if not user_input:
+        return JSONResponse({"status": False, "error": "No input provided"}, status_code=400)
+
+    plan_data = await _create_plan_impl(user_input)
+    return JSONResponse(plan_data, status_code=200 if plan_data.get("status") else 500)
+
+
+async def _create_plan_impl(user_input: str) -> dict:
+    """Ask the LLM for a plan and return the planner response dict."""
+    prompt = _PLAN_PROMPT_TEMPLATE.format(tool_context=_TOOL_CONTEXT, user_input=user_input)
+
     payload = {
         "model": "Qwen3-Coder-480B-A35B-Instruct-GPTQ-Int4-Int8Mix",
         "messages": [
@@ -100,11 +159,12 @@ User Goal: "{user_input}"
         "temperature": 0.5,
     }
 
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {API_KEY}"}
     log_step("plan_generation", "started", {"goal": user_input})
 
     try:
-        response = requests.post(API_ENDPOINT, headers=headers, json=payload, timeout=90)
+        response = await asyncio.to_thread(
+            _session.post, API_ENDPOINT, json=payload, timeout=(5, 90)
+        )
         response.raise_for_status()
         result = response.json()
 
@@ -112,46 +172,110 @@ User Goal: "{user_input}"
         plan_data = extract_json_from_text(content)
 
         log_step("plan_generation", "success", {"task_count": len(plan_data.get("plans", []))})
-        return JSONResponse({
+        return {
             "status": True,
             "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "goal": user_input,
             "plan": plan_data,
             "tools": list(TOOLS.keys())
-        })
+        }
 
     except Exception as e:
         log_step("plan_generation", "failed", {"error": str(e)})
-        return JSONResponse({"status": False, "error": str(e)}, status_code=500)
+        return {"status": False, "error": str(e)}
 
 # =====================================================
 # Direct Call (for Orchestrator)
 # =====================================================
-def generate_plan(user_input: str):
-    from fastapi.testclient import TestClient
-    client = TestClient(app)
-    return client.post("/create_plan", json={"user_input": user_input}).json()
+async def generate_plan(user_input: str):
+    key = make_key(user_input)
+    plan_data = _PLAN_CACHE.get(key)
+    if plan_data is not None:
+        log_step("plan_generation", "success", {"goal": user_input, "cache": "hit"})
+        return plan_data
+
+    plan_data = await _create_plan_impl(user_input)
+    if plan_data.get("status"):
+        _PLAN_CACHE.set(key, plan_data)
+    return plan_data
+
+def pin_plan(user_input: str):
+    """Keep the cached plan for this goal hot (never evicted or expired)."""
+    _PLAN_CACHE.pin(make_key(user_input))
 
 # =====================================================
 # SOC Report Generator
 # =====================================================
-def generate_report_from_results(goal: str, exec_results: dict):
-    """Generate a human-readable SOC report from execution results."""
-    prompt = f"""
-You are XYZ, a senior SOC analyst creating an incident report.
+REPORT_TOP_HITS = 10
+
+
+def _get_field(doc: dict, path: str):
+    """Resolve a dotted field path ("rule.level") inside a hit document."""
+    for part in path.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _summarize_hits(hits: list) -> dict:
+    """Condense a list of OpenSearch hits: counts, unique IPs, top-k by severity."""
+    # dedupe identical events, keeping first-seen order
+    dedup_option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    unique_hits = list({orjson.dumps(h, option=dedup_option, default=str): h for h in hits}.values())
+
+    source_ips = set()
+    descriptions = Counter()
+    for hit in unique_hits:
+        for field in SOURCE_IP_FIELDS:
+            ip = _get_field(hit, field)
+            if isinstance(ip, str):
+                source_ips.add(ip)
+        description = _get_field(hit, "rule.description")
+        if isinstance(description, str):
+            descriptions[description] += 1
+
+    def level(hit):
+        value = _get_field(hit, "rule.level")
+        return value if isinstance(value, (int, float)) else -1
+
+    return {
+        "total_hits": len(hits),
+        "unique_hits": len(unique_hits),
+        "unique_source_ips": sorted(source_ips),
+        "rule_descriptions": dict(descriptions.most_common()),
+        "top_hits": sorted(unique_hits, key=level, reverse=True)[:REPORT_TOP_HITS],
+    }
 
-Investigation Goal:
-"{goal}"
 
-Raw Execution Results (JSON):
-{json.dumps(exec_results, indent=2)}
+def _summarize_for_report(exec_results: dict) -> dict:
+    """
+    Shrink orchestrator results before they go into the report prompt.
+    Hit lists are summarized; other task outputs are kept verbatim.
+    """
+    summary = {}
+    for task_id, result in (exec_results.get("aggregated_results") or {}).items():
+        if isinstance(result, list) and all(isinstance(h, dict) for h in result):
+            summary[task_id] = _summarize_hits(result)
+        else:
+            summary[task_id] = result
+
+    return {
+        "executed_at": exec_results.get("executed_at"),
+        "plan": exec_results.get("plan"),
+        "errors": [r for r in exec_results.get("task_results") or [] if "error" in r],
+        "results": summary,
+    }
 
-Write a structured SOC report that includes:
-- Executive Summary
-- Key Findings
-- Detected Threats / Anomalies
-- Recommendations
-"""
+
+def generate_report_from_results(goal: str, exec_results: dict):
+    """Generate a human-readable SOC report from execution results."""
+    results = orjson.dumps(
+        _summarize_for_report(exec_results),
+        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+        default=str,
+    ).decode()
+    prompt = _REPORT_PROMPT_TEMPLATE.format(goal=goal, results=results)
 
     payload = {
         "model": "Qwen3-Coder-480B-A35B-Instruct-GPTQ-Int4-Int8Mix",
@@ -162,10 +286,8 @@ Write a structured SOC report that includes:
         "temperature": 0.4,
     }
 
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {API_KEY}"}
-
     try:
-        response = requests.post(API_ENDPOINT, headers=headers, json=payload, timeout=120)
+        response = _session.post(API_ENDPOINT, json=payload, timeout=(5, 120))
         response.raise_for_status()
         report_text = response.json()["choices"][0]["message"]["content"]
         log_step("report_generation", "success", {"summary": "Report generated successfully"})
@@ -0,0 +1,98 @@
+"""
+TTLCache / TieredCache behaviour: expiry, LRU order, pinning, disk-tier promotion.
+"""
+
+import time
+
+import pytest
+
+pytest.importorskip("orjson")
+
+from tools import cache
+from tools.cache import TieredCache, TTLCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic()/time.time() for the cache module."""
+    now = {"t": 1000.0}
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now["t"])
+    monkeypatch.setattr(cache.time, "time", lambda: now["t"])
+    return now
+
+
+def test_entries_expire_after_ttl(clock):
+    c = TTLCache(maxsize=4, ttl=10)
+    c.set("a", 1)
+    clock["t"] += 9
+    assert c.get("a") == 1
+    clock["t"] += 2
+    assert c.get("a") is None
+    assert "a" not in c
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    c = TTLCache(maxsize=4, ttl=10)
+    c.set("short", 1, ttl=1)
+    clock["t"] += 2
+    assert c.get("short") is None
+
+
+def test_lru_evicts_least_recently_used():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")  # "b" is now the oldest
+    c.set("c", 3)
+    assert "b" not in c
+    assert c.get("a") == 1 and c.get("c") == 3
+
+
+def test_pinned_keys_survive_eviction_and_expiry(clock):
+    c = TTLCache(maxsize=2, ttl=10)
+    c.set("hot", 1)
+    c.pin("hot")
+    c.set("b", 2)
+    c.set("c", 3)
+    assert c.get("hot") == 1
+    assert "b" not in c and c.get("c") == 3
+    clock["t"] += 60
+    assert c.get("hot") == 1
+    c.unpin("hot")
+    assert c.get("hot") is None
+
+
+def test_eviction_stops_when_everything_is_pinned():
+    c = TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.pin("a")
+    c.set("b", 2)
+    c.pin("b")
+    c.set("c", 3)  # the only unpinned key, so it is the one evicted
+    assert c.get("a") == 1 and c.get("b") == 2
+    assert "c" not in c
+
+
+def test_make_key_ignores_dict_order():
+    assert make_key("t", {"a": 1, "b": 2}) == make_key("t", {"b": 2, "a": 1})
+    assert make_key("t", {"a": 1}) != make_key("u", {"a": 1})
+
+
+def test_tiered_cache_without_disk_is_ram_only():
+    c = TieredCache(ram_lru=2, ttl=60, disk_dir=None)
+    c.set("k", [1])
+    assert c.get("k") == [1]
+    assert c.disk is None
+
+
+def test_disk_hit_is_promoted_with_remaining_ttl(tmp_path, clock):
+    pytest.importorskip("diskcache")
+    c = TieredCache(ram_lru=2, ttl=10, disk_dir=str(tmp_path))
+    c.set("k", [1])
+    c.ram.clear()
+
+    clock["t"] += 6
+    assert c.get("k") == [1]  # served from disk, promoted to RAM
+    assert "k" in c.ram
+    clock["t"] += 5  # 11s after the original set: past the disk entry's expiry
+    assert c.ram.get("k") is None
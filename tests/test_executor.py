@@ -0,0 +1,114 @@
+"""
+Executor plan runs against a fake OpenSearch client (no cluster needed).
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("opensearchpy")
+pytest.importorskip("dotenv")
+pytest.importorskip("pydantic")
+orjson = pytest.importorskip("orjson")
+
+import executor_agent
+from tools import main_opensearch
+from tools.cache import TieredCache
+
+
+class FakeClient:
+    """Answers every _msearch item with one hit naming the index it was sent to."""
+
+    def __init__(self):
+        self.msearch_calls = []
+
+    def msearch(self, body):
+        lines = [orjson.loads(line) for line in body.splitlines() if line]
+        headers, bodies = lines[::2], lines[1::2]
+        self.msearch_calls.append(bodies)
+        return {
+            "responses": [
+                {"hits": {"hits": [{"_source": {"index": header["index"]}}]}}
+                for header in headers
+            ]
+        }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(main_opensearch, "_get_client", lambda: fake)
+    monkeypatch.setattr(executor_agent, "_RESULTS", TieredCache(ram_lru=16, ttl=60))
+    main_opensearch._tool_results.clear()
+    return fake
+
+
+def test_plan_with_dict_query_batches_vulnerability_search(client):
+    plan = {
+        "plans": [
+            {"task_id": "1", "sub_task": "failed ssh logins", "tool_name": "build_query",
+             "dependent_on_tasks": []},
+            {"task_id": "2", "sub_task": "ssh alerts", "tool_name": "search_alerts",
+             "dependent_on_tasks": ["1"]},
+            {"task_id": "3", "sub_task": "vulnerable hosts", "tool_name": "search_vulnerabilities",
+             "dependent_on_tasks": ["1"]},
+        ]
+    }
+
+    result = asyncio.run(executor_agent.run_execution_plan(plan))
+
+    assert result["status"]
+    by_id = {r["task_id"]: r for r in result["task_results"]}
+    assert "error" not in by_id["3"]
+    assert by_id["3"]["result"] == [{"index": "wazuh-alerts-*"}]
+    # both searches went out in a single _msearch round-trip
+    assert len(client.msearch_calls) == 1
+    assert len(client.msearch_calls[0]) == 2
+
+
+def test_plan_with_cycles_and_bad_ids_runs_the_rest(client):
+    plan = {
+        "plans": [
+            {"task_id": "1", "sub_task": "failed ssh logins", "tool_name": "build_query",
+             "dependent_on_tasks": ["1"]},  # self-dependency: ignored
+            {"task_id": "2", "sub_task": "ssh alerts", "tool_name": "search_alerts",
+             "dependent_on_tasks": ["1"]},
+            {"task_id": "3", "sub_task": "agent a", "tool_name": "get_agent_data",
+             "dependent_on_tasks": ["4"]},
+            {"task_id": "4", "sub_task": "agent b", "tool_name": "get_agent_data",
+             "dependent_on_tasks": ["3"]},
+            {"task_id": "5", "sub_task": "downstream", "tool_name": "search_alerts",
+             "dependent_on_tasks": ["3"]},
+            {"task_id": "1", "sub_task": "duplicate", "tool_name": "build_query"},
+            {"sub_task": "no id", "tool_name": "build_query"},
+        ]
+    }
+
+    result = asyncio.run(executor_agent.run_execution_plan(plan))
+
+    assert result["status"]
+    assert set(result["aggregated_results"]) == {"1", "2"}
+    errors = [r for r in result["task_results"] if "error" in r]
+    assert sorted(str(r["task_id"]) for r in errors) == ["1", "3", "4", "5", "None"]
+    assert sum("circular dependency" in r["error"] for r in errors) == 3
+
+
+def test_cached_search_results_are_private_copies(client):
+    plan = {
+        "plans": [
+            {"task_id": "1", "sub_task": "failed ssh logins", "tool_name": "build_query",
+             "dependent_on_tasks": []},
+            {"task_id": "2", "sub_task": "ssh alerts", "tool_name": "search_alerts",
+             "dependent_on_tasks": ["1"]},
+            {"task_id": "3", "sub_task": "ssh logs", "tool_name": "search_raw_logs",
+             "dependent_on_tasks": ["1"]},
+        ]
+    }
+
+    first = asyncio.run(executor_agent.run_execution_plan(plan))
+    first["aggregated_results"]["2"].append({"index": "tampered"})
+    second = asyncio.run(executor_agent.run_execution_plan(plan))
+
+    assert second["aggregated_results"]["2"] == [{"index": "wazuh-alerts-*"}]
+    # the second run was served from the cache
+    assert len(client.msearch_calls) == 1
@@ -0,0 +1,119 @@
+"""
+OpenSearch tool helpers that run without a cluster.
+"""
+
+import pytest
+
+pytest.importorskip("opensearchpy")
+pytest.importorskip("dotenv")
+pytest.importorskip("pydantic")
+orjson = pytest.importorskip("orjson")
+
+from tools import main_opensearch
+
+
+class ScanStub:
+    """Stands in for opensearchpy.helpers.scan; fails after `fail_after` hits."""
+
+    def __init__(self, total=5, fail_after=None):
+        self.total = total
+        self.fail_after = fail_after
+        self.closed = False
+
+    def __call__(self, client, query=None, index=None, size=None, preserve_order=False):
+        return self._hits()
+
+    def _hits(self):
+        try:
+            for n in range(self.total):
+                if n == self.fail_after:
+                    raise ConnectionError("scroll failed")
+                yield {"_source": {"n": n}}
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def scan_stub(monkeypatch):
+    def install(**kwargs):
+        stub = ScanStub(**kwargs)
+        monkeypatch.setattr(main_opensearch, "scan", stub)
+        monkeypatch.setattr(main_opensearch, "_get_client", lambda: object())
+        return stub
+    return install
+
+
+def test_scan_streams_up_to_limit(scan_stub):
+    stub = scan_stub(total=5)
+    assert list(main_opensearch.search_alerts("x", limit=3)) == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert stub.closed
+
+
+def test_scan_first_page_failure_is_an_error(scan_stub):
+    scan_stub(fail_after=0)
+    result = main_opensearch.search_alerts("x", limit=3)
+    assert isinstance(result, dict) and "error" in result
+
+
+def test_scan_failure_mid_stream_reaches_consumer(scan_stub):
+    scan_stub(total=5, fail_after=2)
+    stream = main_opensearch.search_alerts("x", limit=5)
+    assert next(stream) == {"n": 0}
+    assert next(stream) == {"n": 1}
+    with pytest.raises(ConnectionError):
+        next(stream)
+
+
+@pytest.mark.parametrize("query", [
+    "sshd",
+    "rule.level:>5 AND agent.name:web-01",
+    "a AND (b OR c)",
+    'data.cve:"CVE-2024-1234"',
+    '"unbalanced ( inside a phrase"',
+    r"path:C\:\\Windows \(x86\)",
+    "NOT a",
+    "rule.level:[5 TO 10]",
+    "timestamp:{2024-01-01 TO *]",
+    "a && b || c",
+])
+def test_is_wellformed_accepts(query):
+    assert main_opensearch._is_wellformed(query)
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "   ",
+    "(a",
+    "a)",
+    '"unterminated',
+    "a AND",
+    "OR a",
+    "a NOT",
+    "a &&",
+    "|| a",
+    "a !",
+    "rule.level:[5 TO 10",
+    "rule.level:5 TO 10]",
+    "x:[1 TO [2 TO 3]]",
+])
+def test_is_wellformed_rejects(query):
+    assert not main_opensearch._is_wellformed(query)
+
+
+def test_escape_neutralizes_lucene_syntax():
+    assert main_opensearch._escape('001" OR agent.id:*') == r'001\" OR agent.id\:\*'
+    assert main_opensearch._escape("a && b || c") == r"a \&& b \|| c"
+    assert main_opensearch._escape("(x)[y]{z}") == r"\(x\)\[y\]\{z\}"
+    assert main_opensearch._escape(7) == "7"
+
+
+def test_search_body_omits_source_without_fields():
+    body = orjson.loads(main_opensearch._build_search_body("x", "1h"))
+    assert "_source" not in body
+    body = orjson.loads(main_opensearch._build_search_body("x", "1h", fields=["@timestamp"]))
+    assert body["_source"] == ["@timestamp"]
+
+
+def test_default_sources_carry_report_fields():
+    _, body = main_opensearch._alerts_request("x")
+    assert set(main_opensearch.SOURCE_IP_FIELDS) <= set(orjson.loads(body)["_source"])
@@ -0,0 +1,154 @@
+"""
+Result Cache — Planner / Executor Short-Circuiting
+--------------------------------------------------
+Small content-addressed caches so repeated investigations skip
+the LLM round-trip and identical OpenSearch queries.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+try:
+    import diskcache
+except ImportError:  # Optional disk tier
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+# =====================================================
+# Key Helpers
+# =====================================================
+def canonical_json(obj) -> bytes:
+    """Stable JSON encoding (sorted keys, no whitespace) for cache keys."""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+
+
+def make_key(*parts) -> str:
+    """sha1 over the canonical JSON of all key parts."""
+    return hashlib.sha1(canonical_json(parts)).hexdigest()
+
+
+# =====================================================
+# In-Memory TTL + LRU Cache
+# =====================================================
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after `ttl` seconds.
+    Pinned keys are never evicted or expired.
+    """
+
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            value, expires_at = item
+            if key not in self._pinned and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store `value`; `ttl` overrides the cache-wide TTL for this entry."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._data.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        # usually a no-op; otherwise drop the oldest unpinned key(s)
+        while len(self._data) > self.maxsize:
+            victim = next((key for key in self._data if key not in self._pinned), _MISSING)
+            if victim is _MISSING:  # everything left is pinned
+                break
+            del self._data[victim]
+
+    def pin(self, key):
+        """Keep `key` hot: exempt it from eviction and expiry."""
+        with self._lock:
+            self._pinned.add(key)
+
+    def unpin(self, key):
+        with self._lock:
+            self._pinned.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._pinned.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+
+# =====================================================
+# Tiered Cache (RAM → optional disk)
+# =====================================================
+class TieredCache:
+    """
+    Hot TTLCache in RAM backed by an optional on-disk `diskcache` tier.
+    The disk tier is skipped when `disk_dir` is None or diskcache is missing.
+    """
+
+    def __init__(self, ram_lru=512, ttl=300, disk_dir=None):
+        self.ttl = ttl
+        self.ram = TTLCache(maxsize=ram_lru, ttl=ttl)
+        self.disk = None
+        if disk_dir and diskcache is not None:
+            self.disk = diskcache.Cache(disk_dir)
+        elif disk_dir:
+            logger.warning("diskcache not installed, disk cache tier disabled.")
+
+    def get(self, key, default=None):
+        value = self.ram.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            item = self.disk.get(key, _MISSING, expire_time=True)
+            # depending on diskcache's code path a miss is `default` or `(default, None)`
+            if item is not _MISSING and item[0] is not _MISSING:
+                value, expire_time = item
+                # promote with the disk entry's remaining lifetime, not a fresh ttl
+                remaining = None if expire_time is None else expire_time - time.time()
+                if remaining is None or remaining > 0:
+                    self.ram.set(key, value, ttl=remaining)
+                    return value
+        return default
+
+    def set(self, key, value):
+        self.ram.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value, expire=self.ttl)
+
+    def pin(self, key):
+        self.ram.pin(key)
+
+    def unpin(self, key):
+        self.ram.unpin(key)
+
+    def clear(self):
+        self.ram.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
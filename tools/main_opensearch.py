@@ -1,8 +1,18 @@
 import os
 import logging
-from datetime import datetime, timedelta
-from opensearchpy import OpenSearch
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from functools import lru_cache
+from itertools import chain
+import orjson
+from opensearchpy import JSONSerializer, OpenSearch, Urllib3HttpConnection
+from opensearchpy.helpers import scan
 from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict
+from tools.cache import TTLCache, make_key
 
 # =====================================================
 # Load environment variables
@@ -17,19 +27,152 @@ OPENSEARCH_PASSWORD = os.getenv("OPENSEARCH_PASSWORD")
 # Configure OpenSearch client
 # =====================================================
 logger = logging.getLogger(__name__)
-try:
-    opensearch_client = OpenSearch(
+
+HEALTH_CHECK_TTL = 30        # seconds a successful health check is trusted
+RECONNECT_BACKOFF_MIN = 5    # first retry delay after a failed connect
+RECONNECT_BACKOFF_MAX = 300
+HEALTH_CHECK_TIMEOUT = 2     # probe timeout; the probe is never retried
+
+class ORJSONSerializer(JSONSerializer):
+    """orjson-backed (de)serializer; response decoding dominates CPU on large hit lists."""
+
+    def loads(self, s):
+        return orjson.loads(s)
+
+    def dumps(self, data):
+        # pre-serialized bodies (_search/_msearch templates) pass straight through
+        if isinstance(data, (str, bytes)):
+            return data
+        return orjson.dumps(data, default=self.default).decode()
+
+def _connect():
+    return OpenSearch(
         hosts=[{"host": OPENSEARCH_HOST, "port": OPENSEARCH_PORT}],
         http_auth=(OPENSEARCH_USER, OPENSEARCH_PASSWORD),
         use_ssl=True,
         verify_certs=False,  # Set True in production
-        ssl_assert_hostname=False
+        ssl_assert_hostname=False,
+        # one keep-alive urllib3 pool (TLS sessions reused) shared by all tools
+        connection_class=Urllib3HttpConnection,
+        pool_maxsize=32,
+        http_compress=True,
+        timeout=10,
+        max_retries=2,
+        retry_on_timeout=True,
+        serializer=ORJSONSerializer()
     )
-    opensearch_client.info()
-    logger.info("✅ Connected to OpenSearch.")
-except Exception as e:
-    logger.error(f"Failed to connect to OpenSearch: {e}")
-    opensearch_client = None
+
+_client_state = {
+    "client": None,
+    "healthy": False,
+    "last_check": 0.0,
+    "retry_at": 0.0,
+    "backoff": RECONNECT_BACKOFF_MIN,
+}
+
+_client_lock = threading.Lock()
+
+def _reset_client():
+    """Drops the client so a forked worker builds its own connection pool."""
+    global _client_lock
+    _client_lock = threading.Lock()  # may have been held by another thread at fork
+    _client_state.update(client=None, healthy=False, last_check=0.0, retry_at=0.0,
+                         backoff=RECONNECT_BACKOFF_MIN)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_client)
+
+def _get_client():
+    """
+    Returns a healthy OpenSearch client, or None while the cluster is unreachable.
+    The client is built lazily on first use. Health is re-checked at most every
+    HEALTH_CHECK_TTL seconds; failed connects are retried with exponential
+    backoff so the process heals without a restart.
+    """
+    state = _client_state
+    if state["healthy"]:
+        if time.monotonic() - state["last_check"] < HEALTH_CHECK_TTL:
+            return state["client"]
+        # stale but last known healthy: one thread re-checks, the rest keep going
+        if not _client_lock.acquire(blocking=False):
+            return state["client"]
+        try:
+            return _check_client(state)
+        finally:
+            _client_lock.release()
+    with _client_lock:
+        return _check_client(state)
+
+def _probe(client):
+    # straight on one connection: bypasses the transport's retry loop, so a
+    # slow cluster costs at most HEALTH_CHECK_TIMEOUT under the lock
+    client.transport.get_connection().perform_request("GET", "/", timeout=HEALTH_CHECK_TIMEOUT)
+
+def _check_client(state):
+    now = time.monotonic()
+    # re-check under the lock: another thread may have just connected
+    if state["healthy"] and now - state["last_check"] < HEALTH_CHECK_TTL:
+        return state["client"]
+    if not state["healthy"] and now < state["retry_at"]:
+        return None
+
+    try:
+        client = state["client"] or _connect()
+        _probe(client)
+    except Exception as e:
+        logger.error(f"Failed to connect to OpenSearch: {e}")
+        state.update(
+            client=None,
+            healthy=False,
+            retry_at=now + state["backoff"],
+            backoff=min(state["backoff"] * 2, RECONNECT_BACKOFF_MAX),
+        )
+        return None
+
+    if not state["healthy"]:
+        logger.info("✅ Connected to OpenSearch.")
+    state.update(client=client, healthy=True, last_check=now, backoff=RECONNECT_BACKOFF_MIN)
+    return client
+
+# =====================================================
+# Tool Input Models (validate kwargs, generate TOOLS inputs)
+# =====================================================
+class ToolArgs(BaseModel):
+    model_config = ConfigDict(extra="forbid", coerce_numbers_to_str=True)
+
+class BuildQueryArgs(ToolArgs):
+    query_string: str
+    time_range: str = "2d"
+
+class SearchRawLogsArgs(ToolArgs):
+    query: str | dict  # Lucene string, or the executor's refined bool query
+    time_range: str = "1h"
+    fields: list[str] | None = None
+    limit: int | None = None
+
+class SearchAlertsArgs(ToolArgs):
+    query: str | dict
+    time_range: str = "1h"
+    min_level: int = 0
+    fields: list[str] | None = None
+    limit: int | None = None
+
+class GetAgentDataArgs(ToolArgs):
+    agent_id: str | None = None
+    agent_name: str | None = None
+
+class SearchVulnerabilitiesArgs(ToolArgs):
+    query: str | dict = "*"
+    time_range: str = "1h"
+    min_level: int = 5
+    fields: list[str] | None = None
+    limit: int | None = None
+
+# caller-side overrides, not advertised to the planner
+_INTERNAL_ARGS = {"fields", "limit"}
+
+def _inputs(args_model):
+    return [name for name in args_model.model_fields if name not in _INTERNAL_ARGS]
 
 # =====================================================
 # Tool Metadata (Planner uses this)
@@ -37,27 +180,27 @@ except Exception as e:
 TOOLS = {
     "build_query": {
         "description": "Build a Wazuh/OpenSearch query for logs based on a search string and time range.",
-        "inputs": ["query_string", "time_range"],
+        "inputs": _inputs(BuildQueryArgs),
         "outputs": ["query_dict"]
     },
     "search_raw_logs": {
         "description": "Search raw logs in OpenSearch.",
-        "inputs": ["query", "time_range"],
+        "inputs": _inputs(SearchRawLogsArgs),
         "outputs": ["log_entries"]
     },
     "search_alerts": {
         "description": "Search Wazuh alerts with optional severity filtering.",
-        "inputs": ["query", "time_range", "min_level"],
+        "inputs": _inputs(SearchAlertsArgs),
         "outputs": ["alert_entries"]
     },
     "get_agent_data": {
         "description": "Retrieve Wazuh agent info by agent_id or agent_name.",
-        "inputs": ["agent_id", "agent_name"],
+        "inputs": _inputs(GetAgentDataArgs),
         "outputs": ["agent_info"]
     },
     "search_vulnerabilities": {
         "description": "Search for vulnerabilities in Wazuh alerts with optional filtering.",
-        "inputs": ["query", "time_range", "min_level"],
+        "inputs": _inputs(SearchVulnerabilitiesArgs),
         "outputs": ["vulnerability_entries"]
     }
 }
@@ -68,16 +211,29 @@ TOOLS = {
 def build_query(query_string, time_range="2d"):
     """
     Returns a structured query dict for OpenSearch/Wazuh.
+    Memoized per (query_string, time_range); each caller gets its own copy.
     """
+    try:
+        cached = _build_query_cached(query_string, time_range)
+    except TypeError:  # unhashable arguments, skip the cache
+        return _build_query(query_string, time_range)
+    return deepcopy(cached)
+
+@lru_cache(maxsize=256)
+def _build_query_cached(query_string, time_range):
+    return _build_query(query_string, time_range)
+
+def _build_query(query_string, time_range):
     time_filter = {}
     if time_range.lower() != "anytime":
-        end_time = datetime.utcnow()
+        # server-side date math rounded to the minute: identical logical queries
+        # produce identical bodies, so OpenSearch's request cache can hit
         if "d" in time_range:
             days = int(time_range.replace("d", ""))
-            start_time = end_time - timedelta(days=days)
+            gte = f"now-{days}d/m"
         else:
-            start_time = end_time
-        time_filter = {"range": {"@timestamp": {"gte": start_time.isoformat(), "lte": end_time.isoformat()}}}
+            gte = "now/m"
+        time_filter = {"range": {"@timestamp": {"gte": gte, "lte": "now/m"}}}
 
     query = {
         "query": {
@@ -91,102 +247,343 @@ def build_query(query_string, time_range="2d"):
     query["query"]["bool"]["filter"].append({"query_string": {"query": query_string}})
     return query
 
-def search_raw_logs(query, time_range="1h"):
-    if not opensearch_client:
-        return {"error": "OpenSearch client not initialized"}
-    search_body = {
-        "query": {
-            "bool": {
-                "must": [{"query_string": {"query": query}}],
-                "filter": [{"range": {"@timestamp": {"gte": f"now-{time_range}"}}}]
-            }
-        },
-        "size": 20
-    }
+# Pre-serialized request bodies: only the variable fields are JSON-encoded per call
+_SEARCH_BODY_TPL = (
+    b'{"query":{"bool":{"must":[{"query_string":{"query":%s}}],'
+    b'"filter":[{"range":{"@timestamp":{"gte":%s}}}%s]}},"size":20%s}'
+)
+_LEVEL_FILTER_TPL = b',{"range":{"rule.level":{"gte":%s}}}'
+_SOURCE_TPL = b',"_source":%s'
+_AGENT_BODY_TPL = b'{"query":{"query_string":{"query":%s}},"size":1}'
+_MSEARCH_HEADER_TPL = b'{"index":%s}\n'
+
+def _json(value):
+    return orjson.dumps(value, default=str)
+
+# _source include-lists per tool; Wazuh documents are large and the planner
+# and report only read these fields. Pass fields= to override.
+# also read by planner_agent's report summary
+SOURCE_IP_FIELDS = ("data.srcip", "src.ip", "source.ip")
+DEFAULT_SOURCES = {
+    "search_alerts": ["@timestamp", "rule.level", "rule.description", "rule.groups",
+                      "agent.id", "agent.name", *SOURCE_IP_FIELDS],
+    "search_raw_logs": ["@timestamp", "full_log", "agent.id", "agent.name", *SOURCE_IP_FIELDS],
+    "search_vulnerabilities": ["@timestamp", "rule.description", "rule.level", "data.vulnerability.*",
+                               "agent.id", "agent.name"],
+}
+
+def _build_search_body(query, time_range, min_level=None, fields=None):
+    """Shared bool query body (JSON bytes) for the search_* tools."""
+    level_filter = _LEVEL_FILTER_TPL % _json(min_level) if min_level is not None else b""
+    source = _SOURCE_TPL % _json(fields) if fields is not None else b""
+    return _SEARCH_BODY_TPL % (_json(query), _json(f"now-{time_range}"), level_filter, source)
+
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+_ESCAPED_CHAR = re.compile(r"\\.")
+_QUOTED_PHRASE = re.compile(r'"[^"]*"')
+_DANGLING_OPERATOR = re.compile(r'^\s*(AND\b|OR\b|&&|\|\|)|(\bAND|\bOR|\bNOT|&&|\|\||!)\s*$')
+
+def _escape(value):
+    """Backslash-escapes Lucene special characters in a user-supplied term."""
+    return _LUCENE_SPECIAL.sub(r"\\\1", str(value))
+
+def _is_wellformed(query):
+    """
+    Cheap structural check for a query_string fragment: balanced parentheses,
+    closed quotes and range brackets ([a TO b], {a TO b}), no dangling
+    boolean operator. Catches inputs OpenSearch would reject with a parse
+    error after a full round-trip.
+    """
+    bare = _ESCAPED_CHAR.sub("", query)
+    if not bare.strip() or bare.count('"') % 2 or _DANGLING_OPERATOR.search(bare):
+        return False
+    depth = 0
+    in_range = False  # ranges don't nest; either bracket may close either opener
+    for ch in _QUOTED_PHRASE.sub("", bare):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+        elif ch in "[{":
+            if in_range:
+                return False
+            in_range = True
+        elif ch in "]}":
+            if not in_range:
+                return False
+            in_range = False
+    return depth == 0 and not in_range
+
+def _raw_logs_request(query, time_range="1h", fields=None):
+    fields = fields or DEFAULT_SOURCES["search_raw_logs"]
+    return "wazuh-archives-*", _build_search_body(query, time_range, fields=fields)
+
+def _alerts_request(query, time_range="1h", min_level=0, fields=None):
+    fields = fields or DEFAULT_SOURCES["search_alerts"]
+    return "wazuh-alerts-*", _build_search_body(query, time_range, min_level, fields)
+
+def _vulnerabilities_request(query="*", time_range="1h", min_level=5, fields=None):
+    vuln_query = "rule.groups:vulnerability-detector"
+    if query != "*":
+        # only Lucene strings can be checked; executor plans pass bool-query dicts
+        if isinstance(query, str) and not _is_wellformed(query):
+            return None  # malformed input: no round-trip, callers return []
+        vuln_query = f"{vuln_query} AND ({query})"
+    fields = fields or DEFAULT_SOURCES["search_vulnerabilities"]
+    return "wazuh-alerts-*", _build_search_body(vuln_query, time_range, min_level, fields)
+
+# (index, body) builders for every search-style tool, shared by the
+# single-search and _msearch paths
+SEARCH_REQUESTS = {
+    "search_raw_logs": _raw_logs_request,
+    "search_alerts": _alerts_request,
+    "search_vulnerabilities": _vulnerabilities_request,
+}
+SEARCH_TOOLS = frozenset(SEARCH_REQUESTS)
+
+def _hit_sources(resp):
+    return [hit["_source"] for hit in resp.get("hits", {}).get("hits", [])]
+
+def _search(tool_name, client, index, search_body):
     try:
-        resp = opensearch_client.search(body=search_body, index="wazuh-archives-*")
-        return [hit["_source"] for hit in resp.get("hits", {}).get("hits", [])]
+        # raw bytes body: skips the client's dict serialization
+        resp = client.transport.perform_request("POST", f"/{index}/_search", body=search_body)
+        return _hit_sources(resp)
     except Exception as e:
-        logger.error(f"search_raw_logs failed: {e}")
-        return []
+        # an error, not [] -- "no hits" must never be cached for a failed search
+        logger.error(f"{tool_name} failed: {e}")
+        return {"error": f"{tool_name} failed: {e}"}
 
-def search_alerts(query, time_range="1h", min_level=0):
-    if not opensearch_client:
-        return {"error": "OpenSearch client not initialized"}
-    search_body = {
-        "query": {
-            "bool": {
-                "must": [{"query_string": {"query": query}}],
-                "filter": [
-                    {"range": {"@timestamp": {"gte": f"now-{time_range}"}}},
-                    {"range": {"rule.level": {"gte": min_level}}}
-                ]
-            }
-        },
-        "size": 20
-    }
+SCAN_BATCH_SIZE = 500  # hits per scroll page when streaming
+
+def _scan(tool_name, client, index, search_body, limit):
+    """
+    Streams up to `limit` hit sources through the scroll API, one page of
+    SCAN_BATCH_SIZE hits in memory at a time. The first page is fetched
+    eagerly so a failed search returns {"error": ...} rather than an empty
+    stream; a scroll failure later on propagates to the consumer.
+    """
+    if limit <= 0:
+        return iter(())
+    query = orjson.loads(search_body)
+    query.pop("size", None)  # page size comes from SCAN_BATCH_SIZE
+    hits = scan(client, query=query, index=index, size=SCAN_BATCH_SIZE, preserve_order=False)
     try:
-        resp = opensearch_client.search(body=search_body, index="wazuh-alerts-*")
-        return [hit["_source"] for hit in resp.get("hits", {}).get("hits", [])]
+        first = next(hits, None)
     except Exception as e:
-        logger.error(f"search_alerts failed: {e}")
-        return []
+        logger.error(f"{tool_name} failed: {e}")
+        hits.close()
+        return {"error": f"{tool_name} failed: {e}"}
+    if first is None:
+        return iter(())
+    return _stream_sources(tool_name, chain([first], hits), hits, limit)
+
+def _stream_sources(tool_name, pages, hits, limit):
+    try:
+        for count, hit in enumerate(pages, 1):
+            yield hit["_source"]
+            if count >= limit:
+                break
+    except Exception as e:
+        logger.error(f"{tool_name} scan failed: {e}")
+        raise
+    finally:
+        hits.close()  # clears the scroll context on early exit
+
+def _run_search(tool_name, client, index, search_body, limit=None):
+    # default: one 20-hit request returning a list; limit=N streams an iterator
+    if limit is None:
+        return _search(tool_name, client, index, search_body)
+    return _scan(tool_name, client, index, search_body, limit)
+
+def search_raw_logs(query, time_range="1h", fields=None, limit=None):
+    client = _get_client()
+    if not client:
+        return {"error": "OpenSearch client not initialized"}
+    index, search_body = _raw_logs_request(query, time_range, fields)
+    return _run_search("search_raw_logs", client, index, search_body, limit)
+
+def search_alerts(query, time_range="1h", min_level=0, fields=None, limit=None):
+    client = _get_client()
+    if not client:
+        return {"error": "OpenSearch client not initialized"}
+    index, search_body = _alerts_request(query, time_range, min_level, fields)
+    return _run_search("search_alerts", client, index, search_body, limit)
 
 def get_agent_data(agent_id=None, agent_name=None):
-    if not opensearch_client:
+    client = _get_client()
+    if not client:
         return {"error": "OpenSearch client not initialized"}
     if not agent_id and not agent_name:
         return {"error": "agent_id or agent_name required"}
-    query_str = f'agent.id:"{agent_id}"' if agent_id else f'agent.name:"{agent_name}"'
-    search_body = {"query": {"query_string": {"query": query_str}}, "size": 1}
-    try:
-        resp = opensearch_client.search(body=search_body, index="wazuh-agent-*")
-        return [hit["_source"] for hit in resp.get("hits", {}).get("hits", [])]
-    except Exception as e:
-        logger.error(f"get_agent_data failed: {e}")
-        return []
+    query_str = f'agent.id:"{_escape(agent_id)}"' if agent_id else f'agent.name:"{_escape(agent_name)}"'
+    return _search("get_agent_data", client, "wazuh-agent-*", _AGENT_BODY_TPL % _json(query_str))
 
-def search_vulnerabilities(query="*", time_range="1h", min_level=5):
-    if not opensearch_client:
+def search_vulnerabilities(query="*", time_range="1h", min_level=5, fields=None, limit=None):
+    client = _get_client()
+    if not client:
         return {"error": "OpenSearch client not initialized"}
-    vuln_query = "rule.groups:vulnerability-detector"
-    if query != "*":
-        vuln_query = f"{vuln_query} AND ({query})"
-    search_body = {
-        "query": {
-            "bool": {
-                "must": [{"query_string": {"query": vuln_query}}],
-                "filter": [
-                    {"range": {"@timestamp": {"gte": f"now-{time_range}"}}}, 
-                    {"range": {"rule.level": {"gte": min_level}}}
-                ]
-            }
-        },
-        "size": 20
-    }
-    try:
-        resp = opensearch_client.search(body=search_body, index="wazuh-alerts-*")
-        return [hit["_source"] for hit in resp.get("hits", {}).get("hits", [])]
-    except Exception as e:
-        logger.error(f"search_vulnerabilities failed: {e}")
+    request = _vulnerabilities_request(query, time_range, min_level, fields)
+    if request is None:
+        logger.warning(f"search_vulnerabilities skipped malformed query: {query!r}")
         return []
+    index, search_body = request
+    return _run_search("search_vulnerabilities", client, index, search_body, limit)
+
+def msearch_tools(calls):
+    """
+    Runs several search_* tool calls in a single _msearch round-trip.
+    `calls` is a list of (tool_name, kwargs); results come back in call order.
+    Raises if the _msearch request itself fails.
+    """
+    client = _get_client()
+    if not client:
+        return [{"error": "OpenSearch client not initialized"} for _ in calls]
+    results = [[] for _ in calls]
+    sent, lines = [], []
+    for i, (tool_name, kwargs) in enumerate(calls):
+        request = SEARCH_REQUESTS[tool_name](**kwargs)
+        if request is None:  # rejected client-side, stays []
+            continue
+        index, search_body = request
+        sent.append(i)
+        lines += [_MSEARCH_HEADER_TPL % _json(index), search_body, b"\n"]
+    if not sent:
+        return results
+
+    body = b"".join(lines)
+    responses = client.msearch(body=body).get("responses", [])
+    if len(responses) != len(sent):
+        raise ValueError(f"msearch returned {len(responses)} responses for {len(sent)} searches")
+
+    for i, item in zip(sent, responses):
+        if "error" in item:
+            logger.error(f"{calls[i][0]} failed in msearch: {item['error']}")
+            results[i] = {"error": f"{calls[i][0]} failed: {item['error']}"}
+        else:
+            results[i] = _hit_sources(item)
+    return results
+
+# tool name -> (callable, input model)
+_TOOL_DISPATCH = {
+    "build_query": (build_query, BuildQueryArgs),
+    "search_raw_logs": (search_raw_logs, SearchRawLogsArgs),
+    "search_alerts": (search_alerts, SearchAlertsArgs),
+    "get_agent_data": (get_agent_data, GetAgentDataArgs),
+    "search_vulnerabilities": (search_vulnerabilities, SearchVulnerabilitiesArgs),
+}
 
 # =====================================================
 # Dynamic executor for any tool
 # =====================================================
+TOOL_RESULT_TTL = 30  # seconds an identical read is served from memory
+_tool_results = TTLCache(maxsize=512, ttl=TOOL_RESULT_TTL)
+
 def execute_tool(tool_name, **kwargs):
     """
     Dynamically executes a tool by name.
+    kwargs are validated against the tool's input model (pydantic's
+    ValidationError is a ValueError). Read results are cached for
+    TOOL_RESULT_TTL seconds per (tool_name, kwargs); only successful hit
+    lists are cached, and each caller gets its own copy. build_query and
+    "anytime" ranges bypass the cache.
     """
-    if tool_name == "build_query":
-        return build_query(**kwargs)
-    elif tool_name == "search_raw_logs":
-        return search_raw_logs(**kwargs)
-    elif tool_name == "search_alerts":
-        return search_alerts(**kwargs)
-    elif tool_name == "get_agent_data":
-        return get_agent_data(**kwargs)
-    elif tool_name == "search_vulnerabilities":
-        return search_vulnerabilities(**kwargs)
-    else:
+    fn, kwargs = _validate_call(tool_name, kwargs)
+    if not _is_cacheable(tool_name, kwargs):
+        return fn(**kwargs)
+
+    # key on the validated args so "7" and 7 share an entry
+    key = make_key(tool_name, kwargs)
+    cached = _tool_results.get(key)
+    if cached is not None:
+        return deepcopy(cached)
+    result = fn(**kwargs)
+    _store_result(key, result)
+    return result
+
+def _validate_call(tool_name, kwargs):
+    """(callable, validated kwargs) for a tool call; raises ValueError on bad input."""
+    entry = _TOOL_DISPATCH.get(tool_name)
+    if entry is None:
         raise ValueError(f"Unknown tool: {tool_name}")
+    fn, args_model = entry
+    return fn, dict(args_model.model_validate(kwargs))
+
+def _is_cacheable(tool_name, kwargs):
+    return tool_name != "build_query" and kwargs.get("time_range") != "anytime"
+
+def _store_result(key, result):
+    # hit lists only: failed searches are {"error": ...} and limit= returns a generator
+    if isinstance(result, list):
+        # a private copy, so callers mutating their result can't alter later hits
+        _tool_results.set(key, deepcopy(result))
+
+def execute_tools_batch(calls):
+    """
+    Executes a list of (tool_name, kwargs) calls, returning results in call order.
+    Validation and caching match execute_tool; uncached search-style calls
+    share one _msearch round-trip, other tools run directly.
+    """
+    calls = [(tool_name, _validate_call(tool_name, kwargs)[1]) for tool_name, kwargs in calls]
+    results = [None] * len(calls)
+    done = set()
+    pending = []  # (position, cache key or None)
+    for i, (tool_name, kwargs) in enumerate(calls):
+        # streaming (limit=...) calls use the scroll API and can't join the _msearch
+        if tool_name not in SEARCH_TOOLS or kwargs.get("limit") is not None:
+            continue
+        key = make_key(tool_name, kwargs) if _is_cacheable(tool_name, kwargs) else None
+        cached = _tool_results.get(key) if key else None
+        if cached is not None:
+            results[i] = deepcopy(cached)
+            done.add(i)
+        else:
+            pending.append((i, key))
+
+    if len(pending) > 1:
+        try:
+            # limit is None for every pending call; the request builders don't take it
+            responses = msearch_tools([
+                (calls[i][0], {k: v for k, v in calls[i][1].items() if k != "limit"})
+                for i, _ in pending
+            ])
+        except Exception as e:
+            logger.error(f"msearch batch failed, running searches individually: {e}")
+        else:
+            for (i, key), result in zip(pending, responses):
+                results[i] = result
+                done.add(i)
+                if key:
+                    _store_result(key, result)
+
+    for i, (tool_name, kwargs) in enumerate(calls):
+        if i not in done:
+            results[i] = execute_tool(tool_name, **kwargs)
+    return results
+
+TOOL_POOL_SIZE = 8
+
+def _new_tool_pool():
+    return ThreadPoolExecutor(max_workers=TOOL_POOL_SIZE, thread_name_prefix="opensearch-tool")
+
+# reused across calls; the client's urllib3 pool is thread-safe
+_tool_pool = _new_tool_pool()
+
+def _reset_tool_pool():
+    """A forked child inherits the pool's dead worker threads; give it a fresh pool."""
+    global _tool_pool
+    _tool_pool = _new_tool_pool()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_tool_pool)
+
+def execute_tools_parallel(calls):
+    """
+    Executes a list of (tool_name, kwargs) calls concurrently on a shared
+    thread pool, returning results in call order. Unlike execute_tools_batch,
+    this also overlaps calls against different index patterns.
+    """
+    futures = [_tool_pool.submit(execute_tool, tool_name, **kwargs) for tool_name, kwargs in calls]
+    return [future.result() for future in futures]